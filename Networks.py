@@ -1,50 +1,132 @@
+import sys
+from operator import itemgetter
+
 import networkx as nx
 import pandas as pd
 import streamlit as st
+from scipy import sparse
+from scipy.sparse import csgraph
 
 # Load data and build graph
+@st.cache_data
+def read_coappearances(filename):
+    return pd.read_csv(
+        filename,
+        usecols=['Character 1', 'Character 2', 'Scenes Together'],
+        dtype={'Character 1': 'category', 'Character 2': 'category', 'Scenes Together': 'int32'}
+    )
+
+@st.cache_resource
 def load_data(filename, min_scenes=1):
-    data = pd.read_csv(filename)
-    G = nx.Graph()
-    for _, row in data.iterrows():
-        if row['Scenes Together'] >= min_scenes:  # Only keep strong connections
-            G.add_edge(row['Character 1'], row['Character 2'], weight=row['Scenes Together'])
+    data = read_coappearances(filename)
+    data = data[data['Scenes Together'] >= min_scenes]  # Only keep strong connections
+    data = data.rename(columns={'Scenes Together': 'weight'})
+    # Intern the names so node keys and the family table share one str object per character.
+    # This has to happen after the cached read: cache_data returns an unpickled copy with fresh strs.
+    for column in ('Character 1', 'Character 2'):
+        data[column] = data[column].cat.rename_categories(sys.intern)
+    G = nx.from_pandas_edgelist(data, 'Character 1', 'Character 2', edge_attr='weight')
+    # Precompute once; the cached graph carries these across reruns
+    G.graph['degree_ranking'] = rank_degrees(G)
+    G.graph['pair_ranking'] = rank_pairs(G)
+    G.graph['path_index'] = build_path_index(G)
+    G.graph['character_stats'] = {}  # Filled per character on first lookup
     return G
 
-# Analysis functions
+# Selectbox options; cache_resource hands back the same tuple, keeping the interned names
+@st.cache_resource
+def sorted_nodes(filename, min_scenes=1):
+    return tuple(sorted(load_data(filename, min_scenes)))
+
+MAX_TOP_N = 20  # Largest "top N" the UI lets you ask for; the helpers themselves take any top_n
+
+# Full stable rankings, so any top_n can be sliced and ties keep graph order
+def rank_degrees(graph):
+    return sorted(graph.degree(), key=itemgetter(1), reverse=True)
+
+def rank_pairs(graph):
+    return sorted(graph.edges(data='weight'), key=itemgetter(2), reverse=True)
+
+# Sparse adjacency for csgraph path searches, with node labels and a label -> row index.
+# Reverse Cuthill-McKee order keeps neighbours close together; csgraph routines want a
+# csr_matrix (32-bit indices), not the csr_array networkx builds.
+def build_path_index(graph):
+    nodes = list(graph)
+    if not nodes:  # to_scipy_sparse_array rejects empty graphs, e.g. a min_scenes filter that drops every edge
+        return sparse.csr_matrix((0, 0)), [], {}
+    matrix = sparse.csr_matrix(nx.to_scipy_sparse_array(graph, nodelist=nodes, weight='weight', format='csr'))
+    # For directed graphs RCM orders the symmetrized pattern; the matrix itself keeps its direction
+    order = csgraph.reverse_cuthill_mckee(matrix, symmetric_mode=not graph.is_directed()).tolist()
+    path_nodes = [nodes[i] for i in order]
+    index = {node: i for i, node in enumerate(path_nodes)}
+    return matrix[order][:, order], path_nodes, index
+
+# Analysis functions; graphs not built by load_data are ranked as they are at call time
 def top_connected_characters(graph, top_n=3):
-    degrees = dict(graph.degree())
-    sorted_degrees = sorted(degrees.items(), key=lambda x: x[1], reverse=True)
-    return sorted_degrees[:top_n]
+    ranking = graph.graph.get('degree_ranking')
+    if ranking is None:
+        ranking = rank_degrees(graph)
+    return ranking[:top_n]
 
 def top_strongest_pairs(graph, top_n=3):
-    edges = graph.edges(data=True)
-    sorted_edges = sorted(edges, key=lambda x: x[2]['weight'], reverse=True)
-    return [((u, v), data['weight']) for u, v, data in sorted_edges[:top_n]]
+    ranking = graph.graph.get('pair_ranking')
+    if ranking is None:
+        ranking = rank_pairs(graph)
+    return [((u, v), weight) for u, v, weight in ranking[:top_n]]
 
 def shortest_path(graph, char1, char2):
-    try:
-        path = nx.shortest_path(graph, char1, char2)  # Correct call
-        return path
-    except nx.NetworkXNoPath:
+    if char1 not in graph:
+        raise nx.NodeNotFound(f"Source {char1} is not in G")
+    if char2 not in graph:
+        raise nx.NodeNotFound(f"Target {char2} is not in G")
+    path_index = graph.graph.get('path_index')
+    if path_index is None:
+        path_index = build_path_index(graph)
+    adjacency, nodes, index = path_index
+    source, target = index[char1], index[char2]
+    _, predecessors = csgraph.shortest_path(
+        adjacency, directed=graph.is_directed(), unweighted=True,
+        indices=source, return_predecessors=True
+    )
+    path = reconstruct_path(predecessors, source, target)
+    if path is None:
+        return None
+    return [nodes[i] for i in path]
+
+def reconstruct_path(predecessors, source, target):
+    # Walk back from target, touching only the entries on the path; int() keeps the path plain Python ints
+    if source != target and predecessors[target] < 0:
         return None
+    path = [target]
+    while path[-1] != source:
+        path.append(int(predecessors[path[-1]]))
+    path.reverse()
+    return path
     
+family_groups = {
+    "Pritchett": ["Jay", "Gloria", "Manny", "Joe"],
+    "Dunphy": ["Claire", "Phil", "Haley", "Alex", "Luke"],
+    "Tucker-Pritchett": ["Mitchell", "Cameron", "Lily"]
+}
+_CHAR_TO_FAMILY = {c: family for family, members in family_groups.items() for c in members}
+
 def get_family(character):
-    family_groups = {
-        "Pritchett": ["Jay", "Gloria", "Manny", "Joe"],
-        "Dunphy": ["Claire", "Phil", "Haley", "Alex", "Luke"],
-        "Tucker-Pritchett": ["Mitchell", "Cameron", "Lily"]
-    }
-    for family, members in family_groups.items():
-        if character in members:
-            return family
-    return "Unknown"
+    return _CHAR_TO_FAMILY.get(character, "Unknown")
 
 def character_stats(graph, character):
+    # Graphs from load_data memoize stats per character; repeat lookups skip the recount
+    cache = graph.graph.get('character_stats')
+    if cache is None:
+        return compute_character_stats(graph, character)
+    if character not in cache:
+        cache[character] = compute_character_stats(graph, character)
+    return cache[character]
+
+def compute_character_stats(graph, character):
     stats = {}
-    stats['total_scenes'] = sum(data['weight'] for _, _, data in graph.edges(character, data=True))
-    neighbors = graph[character]
-    stats['top_co_character'] = max(neighbors.items(), key=lambda x: x[1]['weight'])
+    neighbors = graph._adj[character]  # Raw adjacency dict, skips the AtlasView wrapper
+    stats['total_scenes'] = sum(data['weight'] for data in neighbors.values())
+    stats['top_co_character'] = max(neighbors.items(), key=lambda x: x[1]['weight'], default=None)
     stats['unique_co_appearances'] = len(neighbors)
     stats['family'] = get_family(character)
     return stats
@@ -77,7 +159,7 @@ def main():
     
     # Load data with current filter
     G = load_data('coappearance_list.csv', min_scenes)
-    nodes = sorted(G.nodes())
+    nodes = sorted_nodes('coappearance_list.csv', min_scenes)
     
     # Main tabs
     tab1, tab2, tab3, tab4 = st.tabs([
@@ -93,7 +175,7 @@ def main():
         
         top_n = st.number_input(
             "How many top characters to show:",
-            min_value=1, max_value=20, value=5, key="top_connected_num"
+            min_value=1, max_value=MAX_TOP_N, value=5, key="top_connected_num"
         )
         top_chars = top_connected_characters(G, top_n)
 
@@ -106,7 +188,7 @@ def main():
 
         top_n = st.number_input(
             "How many top pairs to show:",
-            min_value=1, max_value=20, value=5, key="top_pairs_num"
+            min_value=1, max_value=MAX_TOP_N, value=5, key="top_pairs_num"
         )
         top_pairs = top_strongest_pairs(G, top_n)
 
@@ -118,9 +200,11 @@ def main():
         st.caption("Find how two characters are connected through others.")
 
         char1 = st.selectbox("First Character", nodes, key="path_char1")
+        # Same options as the first box so the widget stays stable; picking char1 twice is caught below
         char2 = st.selectbox(
             "Second Character", 
-            [c for c in nodes if c != char1], 
+            nodes, 
+            index=1 if nodes and nodes[0] == char1 and len(nodes) > 1 else 0,
             key="path_char2"
         )
 
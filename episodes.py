@@ -1,77 +1,92 @@
+import mmap
+import os
 import re
-from collections import defaultdict
+
+# Marker lines: scene starts ("=== Scene 2 ==="), scene ends ("-----") and episode lines ("1x02 The Bicycle Thief").
+# Leading whitespace is allowed, as the lines used to be stripped before matching.
+MARKER_PATTERNS = {
+    'start': r'^[^\S\n]*===.*Scene.*$',
+    'end': r'^[^\S\n]*---.*$',
+    'episode': r'^[^\S\n]*(\d+)x(\d+)[^\S\n]*(.*)$',
+}
+# Compiled for str input and for bytes-like input such as a memory-mapped file
+STR_MARKERS = {name: re.compile(pattern, re.M) for name, pattern in MARKER_PATTERNS.items()}
+BYTES_MARKERS = {name: re.compile(pattern.encode(), re.M) for name, pattern in MARKER_PATTERNS.items()}
+
+def decode_span(span):
+    # str() decodes bytes and memoryview slices alike, without an intermediate bytes copy
+    return span if isinstance(span, str) else str(span, 'utf-8')
+
+def decode_scene(span):
+    # Strip every line like the line-based parser did; this also drops the "\r" of CRLF files
+    return '\n'.join(line.strip() for line in decode_span(span).split('\n'))
 
 def extract_episodes_from_text(text_data):
     """
     Extract episode information from text data with scene markers.
     
     Args:
-        text_data (str): The full text content with scene markers
+        text_data (str or bytes-like): The full text content with scene markers,
+            e.g. a memoryview of a memory-mapped UTF-8 file; only matched spans get decoded
         
     Returns:
         dict: {episode_code: {'title': str, 'scenes': list}}
         list: All scenes with their episode context
     """
-    episodes = defaultdict(dict)
+    episodes = {}
     scenes_with_episodes = []
     current_episode = None
     current_episode_title = None
+    current_scenes = None  # Scene list of current_episode, kept local for the appends
     
-    # Regex to match episode lines (e.g., "1x02 The Bicycle Thief")
-    episode_pattern = re.compile(r'(\d+)x(\d+)\s*(.*)')
+    markers = STR_MARKERS if isinstance(text_data, str) else BYTES_MARKERS
+    scene_end_pattern, episode_pattern = markers['end'], markers['episode']
     
-    lines = text_data.split('\n')
-    scene_buffer = []
-    in_scene = False
+    # A scene runs from its "===" line up to the next one. The regex engine finds the
+    # boundaries and searches within them, so Python only loops once per scene.
+    starts = [match.start() for match in markers['start'].finditer(text_data)]
+    starts.append(len(text_data))
     
-    for line in lines:
-        line = line.strip()
+    for scene_start, next_start in zip(starts, starts[1:]):
+        scene_end = scene_end_pattern.search(text_data, scene_start, next_start)
+        scene_stop = scene_end.start() if scene_end else next_start
         
-        # Detect scene start
-        if line.startswith('===') and 'Scene' in line:
-            in_scene = True
-            scene_buffer = [line]
-            continue
-            
-        # Detect scene end
-        if in_scene and line.startswith('---'):
-            in_scene = False
-            if scene_buffer and current_episode:
-                scene_content = '\n'.join(scene_buffer)
-                episodes[current_episode]['scenes'].append(scene_content)
-                scenes_with_episodes.append({
-                    'episode': current_episode,
-                    'title': current_episode_title,
-                    'scene': scene_content
-                })
-            continue
+        # Episode info lines inside the scene (e.g., "1x02 The Bicycle Thief")
+        for match in episode_pattern.finditer(text_data, scene_start, scene_stop):
+            season, episode_num, title = map(decode_span, match.groups())
+            episode_code = f"S{season}E{episode_num.zfill(2)}"
+            current_episode = episode_code
+            current_episode_title = title.strip()
             
-        # Process scene content
-        if in_scene:
-            scene_buffer.append(line)
-            
-            # Check for episode info line (e.g., "1x02 The Bicycle Thief")
-            match = episode_pattern.match(line)
-            if match:
-                season, episode_num, title = match.groups()
-                episode_code = f"S{season}E{episode_num.zfill(2)}"
-                current_episode = episode_code
-                current_episode_title = title.strip()
-                
-                # Initialize episode if not already present
-                if episode_code not in episodes:
-                    episodes[episode_code] = {
-                        'title': title.strip(),
-                        'scenes': []
-                    }
+            # Initialize episode if not already present
+            episode = episodes.setdefault(episode_code, {
+                'title': current_episode_title,
+                'scenes': []
+            })
+            current_scenes = episode['scenes']
+        
+        # Keep closed scenes only; the content stops at the newline before the "---" line
+        if scene_end and current_episode:
+            scene_content = decode_scene(text_data[scene_start:scene_end.start() - 1])
+            current_scenes.append(scene_content)
+            scenes_with_episodes.append({
+                'episode': current_episode,
+                'title': current_episode_title,
+                'scene': scene_content
+            })
     
-    return dict(episodes), scenes_with_episodes
+    return episodes, scenes_with_episodes
 
 def process_scene_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        text_data = f.read()
-    
-    episodes, scenes = extract_episodes_from_text(text_data)
+    # Map the file instead of reading it, so pages load on demand and no full copy is held.
+    # The memoryview makes each scene slice zero-copy until it is decoded.
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            episodes, scenes = extract_episodes_from_text(b'')  # mmap refuses empty files
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                    memoryview(mapped) as text_data:
+                episodes, scenes = extract_episodes_from_text(text_data)
     
     print(f"Found {len(episodes)} episodes:")
     for ep_code, data in episodes.items():
@@ -83,10 +98,10 @@ if __name__ == "__main__":
     # Process scene file
     episode_data, scene_data = process_scene_file("modern_family_scenes.txt")
     
-    # Save structured data
-    import json
-    with open("episodes.json", "w") as f:
-        json.dump(episode_data, f, indent=2)
+    # Save structured data; orjson encodes in native code and writes UTF-8 bytes directly
+    import orjson
+    with open("episodes.json", "wb") as f:
+        f.write(orjson.dumps(episode_data, option=orjson.OPT_INDENT_2))
     
     print("\nExample scene from first episode:")
     first_ep = next(iter(episode_data.values()))